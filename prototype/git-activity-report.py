@@ -17,28 +17,46 @@ Examples:
     --split-out out/last6 --save-patches out/last6/patches --github-prs
 """
 
-from dataclasses import dataclass
-import argparse, json, os, re, shutil, subprocess, sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import argparse, base64, functools, hashlib, json, math, os, queue, re, shutil, subprocess, sys
+import tempfile, threading, time, uuid
+import http.client, urllib.parse, urllib.request
 from datetime import datetime, timedelta, timezone
 
+try:
+    import orjson  # optional: faster encoder, writes bytes directly
+except ImportError:
+    orjson = None
+
 # ---------- configuration ----------
 
 
 @dataclass
 class ReportConfiguration:
     tz: str = "local"  # "local" or "utc"
+    pr_cache_dir: str = ""  # on-disk PR cache root ("" disables)
+    approx_files_touched: bool = False  # HyperLogLog summary.files_touched
+    pretty: bool = False  # indent JSON output (compact otherwise)
     # In the future: include_patch defaults, max_patch_bytes, estimation settings, etc.
 
 
 RC = ReportConfiguration()  # module-level singleton
 
 
+def local_datetime(epoch):
+    # the offset depends on the timestamp (zones change rules), so ask the OS each time
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).astimezone()
+
+
 def iso_in_tz(epoch, tz=None):
     tz = RC.tz if tz is None else tz
-    dt = datetime.fromtimestamp(epoch, tz=timezone.utc)
 
     if tz == "local":
-        dt = dt.astimezone()
+        dt = local_datetime(epoch)
+    else:
+        dt = datetime.fromtimestamp(epoch, tz=timezone.utc)
     return dt.isoformat(timespec="seconds")
 
 
@@ -64,7 +82,24 @@ def short_sha(sha):
 
 # ---------- GitHub (quiet/optional) ----------
 
+GH_MAX_WORKERS = 10  # concurrent PR lookups; keeps us clear of secondary rate limits
+GH_MAX_RETRIES = 3
+GH_MAX_BACKOFF = 60  # seconds
+GH_GRAPHQL_BATCH = 50  # commits aliased into one GraphQL document
+_GH_SLOTS = threading.Semaphore(GH_MAX_WORKERS)  # shared by every pool in the process
+GH_API_HOST = "api.github.com"
+GH_TIMEOUT = 10  # seconds
+_GH_IDLE = queue.LifoQueue()  # idle keep-alive connections; at most GH_MAX_WORKERS
+_GH_RATE_LIMITED = threading.Event()  # unauthenticated quota spent; stop asking
+_GH_WARN_LOCK = threading.Lock()
 
+
+_ORIGIN_RE = re.compile(
+    r"(?:git@github\.com:|https?://github\.com/)([^/]+)/([^/]+?)(?:\.git)?$"
+)
+
+
+@functools.lru_cache(maxsize=8)
 def parse_origin_github(root):
     try:
         url = git(root, "config", "--get", "remote.origin.url").strip()
@@ -72,71 +107,281 @@ def parse_origin_github(root):
         return None
     if not url:
         return None
-    m = re.match(
-        r"(?:git@github\.com:|https?://github\.com/)([^/]+)/([^/]+?)(?:\.git)?$", url
-    )
+    m = _ORIGIN_RE.match(url)
     if not m:
         return None
     return (m.group(1), m.group(2))
 
 
+def gh_retry_delay(headers, attempt):
+    """Seconds to wait after a 403/429: until X-RateLimit-Reset if exhausted, else 2^n."""
+    reset = headers.get("X-RateLimit-Reset")
+
+    if headers.get("X-RateLimit-Remaining") == "0" and reset:
+        return min(GH_MAX_BACKOFF, max(1, int(reset) - int(time.time())))
+    retry_after = headers.get("Retry-After")
+
+    if retry_after:
+        return min(GH_MAX_BACKOFF, int(retry_after))
+    return 2**attempt
+
+
+def gh_headers():
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "User-Agent": "git-activity-report",
+    }
+    token = os.environ.get("GITHUB_TOKEN")
+
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def gh_connection():
+    """New API connection, tunnelled through HTTPS_PROXY/https_proxy like urllib would."""
+    proxy = urllib.request.getproxies().get("https")
+
+    if not proxy or urllib.request.proxy_bypass(GH_API_HOST):
+        return http.client.HTTPSConnection(GH_API_HOST, timeout=GH_TIMEOUT)
+    u = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    conn = http.client.HTTPSConnection(u.hostname, u.port or 80, timeout=GH_TIMEOUT)
+    headers = {}
+
+    if u.username:
+        cred = f"{urllib.parse.unquote(u.username)}:{urllib.parse.unquote(u.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(cred.encode()).decode()
+    conn.set_tunnel(GH_API_HOST, 443, headers=headers)
+    return conn
+
+
+def gh_request(method, path, body=None):
+    """Send one request over a pooled keep-alive connection; (status, headers, bytes)."""
+    try:
+        conn = _GH_IDLE.get_nowait()
+    except queue.Empty:
+        conn = gh_connection()
+    try:
+        conn.request(method, path, body=body, headers=gh_headers())
+        resp = conn.getresponse()
+        data = resp.read()
+    except (http.client.HTTPException, OSError):
+        conn.close()
+        raise
+    _GH_IDLE.put(conn)
+    return resp.status, resp.headers, data
+
+
+def gh_rate_limited():
+    """Warn once on stderr and turn further unauthenticated lookups into no-ops."""
+    with _GH_WARN_LOCK:
+        if _GH_RATE_LIMITED.is_set():
+            return
+        _GH_RATE_LIMITED.set()
+    print(
+        "warning: GitHub API rate limit hit without GITHUB_TOKEN; skipping remaining PR lookups",
+        file=sys.stderr,
+    )
+
+
+def gh_fetch_json(path, body=None):
+    """GET (or POST `body`) an API path; retries dropped connections and rate limits."""
+    method = "GET" if body is None else "POST"
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    attempt = 0
+    while True:
+        try:
+            with _GH_SLOTS:
+                status, headers, payload = gh_request(method, path, data)
+        except (http.client.HTTPException, OSError):
+            if attempt >= GH_MAX_RETRIES:
+                raise
+            status, headers, payload = None, {}, b""
+        if status is not None and status < 300:
+            return json.loads(payload.decode("utf-8"))
+        if status in (403, 429) and not os.environ.get("GITHUB_TOKEN"):
+            # the unauthenticated quota is per hour; waiting out the reset isn't worth it
+            gh_rate_limited()
+            raise RuntimeError(f"GitHub API {method} {path} rate limited: HTTP {status}")
+        if status not in (None, 403, 429) or attempt >= GH_MAX_RETRIES:
+            raise RuntimeError(f"GitHub API {method} {path} failed: HTTP {status}")
+        delay = 0.5 * 2**attempt if status is None else gh_retry_delay(headers, attempt)
+        attempt += 1
+        time.sleep(delay)
+
+
+def gh_pr_summary(pr):
+    html = pr.get("html_url")
+    return {
+        "number": pr.get("number"),
+        "title": pr.get("title"),
+        "state": pr.get("state"),
+        "created_at": pr.get("created_at"),
+        "merged_at": pr.get("merged_at"),
+        "html_url": html,
+        "diff_url": f"{html}.diff" if html else None,
+        "patch_url": f"{html}.patch" if html else None,
+        "user": {"login": (pr.get("user") or {}).get("login")},
+        "head": (pr.get("head") or {}).get("ref"),
+        "base": (pr.get("base") or {}).get("ref"),
+    }
+
+
 def gh_prs_for_commit(root, sha):
-    """Return [] on any failure. If authenticated, returns minimal PR list."""
+    """Return None on any failure; unauthenticated when GITHUB_TOKEN is unset."""
     owner_repo = parse_origin_github(root)
 
-    if not owner_repo:
-        return []
+    if not owner_repo or _GH_RATE_LIMITED.is_set():
+        return None
     owner, repo = owner_repo
+    try:
+        prs = gh_fetch_json(f"/repos/{owner}/{repo}/commits/{sha}/pulls")
+        return [gh_pr_summary(pr) for pr in prs]
+    except Exception:
+        return None
+
+
+def gh_prs_rest(root, shas):
+    """{sha: prs} for the shas that were looked up successfully."""
+    out = {}
+    for sha in shas:
+        prs = gh_prs_for_commit(root, sha)
+
+        if prs is not None:
+            out[sha] = prs
+    return out
+
+
+GH_GRAPHQL_PR_FIELDS = """
+... on Commit {
+  associatedPullRequests(first: 5) {
+    nodes {
+      number title state createdAt mergedAt url
+      author { login }
+      headRefName baseRefName
+    }
+  }
+}"""
+
+
+def gh_pr_from_graphql(node):
+    """Reshape a GraphQL PR node into the REST fields gh_pr_summary reads."""
+    return {
+        "number": node.get("number"),
+        "title": node.get("title"),
+        "state": "open" if node.get("state") == "OPEN" else "closed",
+        "created_at": node.get("createdAt"),
+        "merged_at": node.get("mergedAt"),
+        "html_url": node.get("url"),
+        "user": node.get("author"),
+        "head": {"ref": node.get("headRefName")},
+        "base": {"ref": node.get("baseRefName")},
+    }
+
+
+def gh_prs_bulk(root, shas):
+    """Look up PRs for many commits in one GraphQL call; {} on any failure."""
+    owner_repo = parse_origin_github(root)
     token = os.environ.get("GITHUB_TOKEN")
+
+    if not owner_repo or not token:
+        return {}
+    owner, repo = owner_repo
+    aliases = [
+        f'c{i}: object(oid: "{sha}") {{{GH_GRAPHQL_PR_FIELDS}}}'
+        for i, sha in enumerate(shas)
+    ]
+    repo_args = f"owner: {json.dumps(owner)}, name: {json.dumps(repo)}"
+    query = f"query {{ repository({repo_args}) {{ {' '.join(aliases)} }} }}"
     try:
-        if token:
-            import urllib.request, json as _json
-
-            url = f"https://api.github.com/repos/{owner}/{repo}/commits/{sha}/pulls"
-            req = urllib.request.Request(
-                url,
-                headers={
-                    "Accept": "application/vnd.github+json",
-                    "Authorization": f"Bearer {token}",
-                    "User-Agent": "git-activity-report",
-                },
-            )
-            with urllib.request.urlopen(req) as r:
-                prs = _json.loads(r.read().decode("utf-8"))
-        elif shutil.which("gh"):
-            out = run(
-                [
-                    "gh",
-                    "api",
-                    f"repos/{owner}/{repo}/commits/{sha}/pulls",
-                    "-H",
-                    "Accept: application/vnd.github+json",
-                ]
-            )
-            prs = json.loads(out)
-        else:
-            return []
-        out_list = []
-        for pr in prs:
-            html = pr.get("html_url")
-            out_list.append(
-                {
-                    "number": pr.get("number"),
-                    "title": pr.get("title"),
-                    "state": pr.get("state"),
-                    "created_at": pr.get("created_at"),
-                    "merged_at": pr.get("merged_at"),
-                    "html_url": html,
-                    "diff_url": f"{html}.diff" if html else None,
-                    "patch_url": f"{html}.patch" if html else None,
-                    "user": {"login": (pr.get("user") or {}).get("login")},
-                    "head": (pr.get("head") or {}).get("ref"),
-                    "base": (pr.get("base") or {}).get("ref"),
-                }
-            )
-        return out_list
+        res = gh_fetch_json("/graphql", body={"query": query})
+        # GraphQL reports failures (rate limits included) with HTTP 200
+        if res.get("errors") or not res.get("data"):
+            return {}
+        found = res["data"].get("repository") or {}
+        out = {}
+        for i, sha in enumerate(shas):
+            commit = found.get(f"c{i}")
+
+            if commit is None:  # not on GitHub (yet): a miss, not "no PRs"
+                continue
+            nodes = (commit.get("associatedPullRequests") or {}).get("nodes") or []
+            out[sha] = [gh_pr_summary(gh_pr_from_graphql(n)) for n in nodes]
+        return out
     except Exception:
-        return []
+        return {}
+
+
+PR_CACHE_MIN_AGE = 24 * 3600  # seconds; younger commits may still be picking up PRs
+
+
+def default_pr_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "git-activity-report", "prs")
+
+
+def pr_cache_path(cache_dir, owner_repo, sha):
+    owner, repo = owner_repo
+    return os.path.join(cache_dir, owner, repo, sha[:2], f"{sha}.json")
+
+
+def pr_cache_read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def pr_cache_write(path, prs):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(prs, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def prs_settled(prs, on_head):
+    """Whether a lookup can't change any more: every PR merged or closed."""
+    if not prs:
+        return on_head  # a commit on an unmerged branch may still get a PR
+    return all(pr.get("merged_at") or pr.get("state") == "closed" for pr in prs)
+
+
+def fetch_prs_cached(fetch, root, batch, on_head=True):
+    """Serve `batch` from the PR cache; only settled, successful lookups are written back."""
+    owner_repo = parse_origin_github(root)
+    shas = [obj["sha"] for obj in batch]
+
+    if not RC.pr_cache_dir or not owner_repo:
+        return fetch(root, shas)
+    out = {}
+    misses = []
+    for obj in batch:
+        path = pr_cache_path(RC.pr_cache_dir, owner_repo, obj["sha"])
+        prs = pr_cache_read(path)
+
+        if prs is None:
+            misses.append((obj, path))
+        else:
+            out[obj["sha"]] = prs
+    if not misses:
+        return out
+    fresh = fetch(root, [obj["sha"] for obj, _ in misses])
+    settled_before = time.time() - PR_CACHE_MIN_AGE
+    for obj, path in misses:
+        prs = fresh.get(obj["sha"])
+
+        if prs is None:
+            continue
+        out[obj["sha"]] = prs
+
+        if obj["timestamps"]["commit"] < settled_before and prs_settled(prs, on_head):
+            pr_cache_write(path, prs)
+    return out
 
 
 # ---------- time windows ----------
@@ -212,54 +457,114 @@ def last_n_weeks_calendar(n, now=None):
     return out
 
 
+_MONTHS_RE = re.compile(
+    r"every\s+month\s+for\s+the\s+last\s+(\d+)\s+months?", re.ASCII
+)
+_WEEKS_RE = re.compile(
+    r"every\s+week\s+for\s+the\s+last\s+(\d+)\s+weeks?", re.ASCII
+)
+
+
 def parse_for_phrase(for_str):
+    """(buckets, single range, label) for a --for phrase; label is None unless named."""
     s = for_str.strip().lower()
-    m = re.match(r"every\s+month\s+for\s+the\s+last\s+(\d+)\s+months?", s)
+    m = _MONTHS_RE.match(s)
 
     if m:
-        return last_n_months_calendar(max(1, int(m.group(1)))), None
-    m = re.match(r"every\s+week\s+for\s+the\s+last\s+(\d+)\s+weeks?", s)
+        return last_n_months_calendar(max(1, int(m.group(1)))), None, None
+    m = _WEEKS_RE.match(s)
 
     if m:
-        return last_n_weeks_calendar(max(1, int(m.group(1)))), None
+        return last_n_weeks_calendar(max(1, int(m.group(1)))), None, None
     if s == "last week":
-        return [], last_week_range()
+        return [], last_week_range(), "last-week"
     if s == "last month":
-        return [], last_month_range()
+        return [], last_month_range(), "last-month"
     # fallback: let git approxidate interpret since; until=now
-    return [], (for_str, "now")
+    return [], (for_str, "now"), None
 
 
-# ---------- git readers (HEAD commits) ----------
+# ---------- git readers (streaming log) ----------
 
+# One `git log` per range: each commit starts with RECORD_MARK, each pretty field
+# ends in NUL, then come the -z raw/numstat/shortstat tokens and the patch.
+# Messages and text patches can't hold NUL, so a NUL-fenced random token can't
+# turn up inside a record.
+_RECORD_TOKEN = uuid.uuid4().hex
+RECORD_MARK = f"\x00{_RECORD_TOKEN}\x00".encode("ascii")
+LOG_FIELDS = 12
+LOG_FORMAT = (
+    f"%x00{_RECORD_TOKEN}%x00"
+    "%H%x00%P%x00%an%x00%ae%x00%ad%x00%cN%x00%cE%x00%cD%x00%at%x00%ct%x00%s%x00%b%x00"
+)
+STREAM_CHUNK = 64 * 1024
 
-def commits_in_range(root, since, until, include_merges=False):
+
+def log_args(since, until, include_merges, include_patch, revs):
     args = [
         "-c",
         "log.showSignature=false",
-        "rev-list",
+        "log",
         f"--since={since}",
         f"--until={until}",
         "--date-order",
         "--reverse",
-        "HEAD",
+        "--date=iso-strict",
+        f"--pretty=format:{LOG_FORMAT}",
+        "-z",
+        "--raw",
+        "--numstat",
+        "--shortstat",
+        "--cc",
+        "--no-color",
     ]
     if not include_merges:
         args.insert(4, "--no-merges")
-    out = git(root, *args)
-    return [l.strip() for l in out.splitlines() if l.strip()]
+    if include_patch:
+        args.append("--patch")
+    return [*args, *revs, "--"]
 
 
-def commit_meta(root, sha):
-    fmt = "%H%x00%P%x00%an%x00%ae%x00%ad%x00%cN%x00%cE%x00%cD%x00%at%x00%ct%x00%s%x00%b"
-    out = git(
-        root, "show", "--no-patch", "--date=iso-strict", f"--pretty=format:{fmt}", sha
+def iter_log_records(root, args):
+    p = subprocess.Popen(
+        ["git", *args], cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE
     )
-    parts = out.split("\x00")
+    pending = []
+    carry = b""  # a chunk tail that may be the start of a split RECORD_MARK
+    keep = len(RECORD_MARK) - 1
+    with p.stdout:
+        for chunk in iter(lambda: p.stdout.read(STREAM_CHUNK), b""):
+            head, *rest = (carry + chunk).split(RECORD_MARK)
+
+            if rest:
+                done = [b"".join([*pending, head]), *rest[:-1]]
+                pending = []
+                head = rest[-1]
+            else:
+                done = []
+            cut = max(0, len(head) - keep)
+            pending.append(head[:cut])
+            carry = head[cut:]
+            for rec in done:
+                # -z separates commits with a NUL, so all but the last end in one
+                rec = rec.removesuffix(b"\x00")
+                if rec:
+                    yield rec
+    tail = b"".join([*pending, carry])
+    err = p.stderr.read().decode("utf-8", "replace")
+    p.stderr.close()
+
+    if p.wait() != 0:
+        raise RuntimeError(f"cmd failed: git {' '.join(args)}\n{err}")
+    if tail:
+        yield tail
+
+
+def parse_meta(fields):
+    if len(fields) != LOG_FIELDS:
+        raise RuntimeError(f"malformed git log record: {len(fields)} of {LOG_FIELDS} fields")
     (h, parents, an, ae, ad, cn, ce, cd, at, ct, subj, body) = (
-        parts
-        if len(parts) >= 12
-        else (sha, "", "", "", "", "", "", "", "0", "0", "", "")
+        f.decode("utf-8", "replace") for f in fields
     )
     at_i = int(at)
     ct_i = int(ct)
@@ -281,250 +586,442 @@ def commit_meta(root, sha):
     }
 
 
-def commit_numstat(root, sha):
-    out = git(root, "show", "--numstat", "--format=", "--no-color", sha)
-    stats = {}
-    files = []
-    for line in out.splitlines():
-        parts = line.split("\t")
+def to_int(x):
+    try:
+        return int(x)
+    except ValueError:
+        return None
 
-        if len(parts) != 3:
-            continue
-        a, d, path = parts
 
-        def to_int(x):
-            try:
-                return int(x)
-            except:
-                return None
+_NUMSTAT_RE = re.compile(rb"(\d+|-)\t(\d+|-)\t(.*)", re.DOTALL)
+_SHORTSTAT_RE = re.compile(rb" \d+ files? changed")
 
-        files.append({"file": path, "additions": to_int(a), "deletions": to_int(d)})
-        stats[path] = (to_int(a), to_int(d))
-    return files, stats
 
+def _token_end(data, i):
+    """Index of the NUL ending the -z token at i (len(data) if unterminated)."""
+    end = data.find(b"\x00", i)
+    return len(data) if end < 0 else end
 
-def commit_name_status(root, sha):
-    out = subprocess.run(
-        ["git", "show", "--name-status", "-z", "--format=", "--no-color", sha],
-        cwd=root,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
 
-    if out.returncode != 0:
-        return []
-    data = out.stdout.decode("utf-8", "replace")
-    parts = data.split("\x00")
-    res = []
+def parse_changes(data):
+    """Parse one commit's -z diff section into (files, shortstat text, patch bytes)."""
+    raw = []
+    stats = []
+    pretty = ""
+    patch = b""
+    n = len(data)
     i = 0
-    while i < len(parts) and parts[i]:
-        code = parts[i]
-        i += 1
-        if code.startswith("R") or code.startswith("C"):
-            if i + 1 >= len(parts):
-                break
-            oldp = parts[i]
-            newp = parts[i + 1]
-            i += 2
-            res.append({"status": code, "old_path": oldp, "file": newp})
-        else:
-            if i >= len(parts):
-                break
-            p = parts[i]
-            i += 1
-            if p == "":
-                continue
-            res.append({"status": code, "file": p})
-    return res
-
+    while i < n:
+        tok_start = i
+        end = _token_end(data, i)
+        i = end + 1
+        start = tok_start
+        while start < end and data[start] == 0x0A:  # leading "\n"
+            start += 1
+        if start == end:
+            continue
+        if data[start] == 0x3A:  # ":"
+            code = data[start:end].split()[-1].decode("utf-8", "replace")
+            npaths = 2 if code[0] in "RC" and data[start + 1] != 0x3A else 1
+            paths = []
+            for _ in range(npaths):
+                end = _token_end(data, i)
+                paths.append(data[i:end].decode("utf-8", "replace"))
+                i = end + 1
+            entry = {"file": paths[-1], "status": code, "additions": None, "deletions": None}
+            if npaths == 2:
+                entry["old_path"] = paths[0]
+            raw.append(entry)
+            continue
+        m = _NUMSTAT_RE.fullmatch(data, start, end)
+
+        if m:
+            a, d, path = m.groups()
+            if path:
+                path = path.decode("utf-8", "replace")
+            else:  # rename/copy: old and new names follow
+                i = _token_end(data, i) + 1
+                end = _token_end(data, i)
+                path = data[i:end].decode("utf-8", "replace")
+                i = end + 1
+            stats.append((path, to_int(a), to_int(d)))
+            continue
+        if _SHORTSTAT_RE.match(data, start, end):
+            nl = data.find(b"\n", start, end)
+            if nl < 0:
+                nl = end
+            pretty = data[start:nl].decode("utf-8", "replace").strip()
+            # --cc merges write numstat/shortstat first; their `::` raw entries run on
+            if nl + 1 < end:
+                i = nl + 1
+            continue
+        patch = data[tok_start:]
+        break
+    return pair_stats(raw, stats), pretty, patch
+
+
+def pair_stats(raw, stats):
+    """Fill numstat counts into the raw entries by position, by path for --cc merges."""
+    if not raw:
+        return [
+            {"file": path, "status": "M", "additions": a, "deletions": d}
+            for path, a, d in stats
+        ]
+    by_path = None
+    for k, entry in enumerate(raw):
+        stat = stats[k] if k < len(stats) else None
+
+        if stat is not None and stat[0] == entry["file"]:
+            entry["additions"], entry["deletions"] = stat[1], stat[2]
+            continue
+        if by_path is None:
+            by_path = {path: (a, d) for path, a, d in stats}
+        entry["additions"], entry["deletions"] = by_path.get(entry["file"], (None, None))
+    return raw
 
-def commit_shortstat(root, sha):
-    out = (
-        git(root, "show", "--shortstat", "--format=", "--no-color", sha)
-        .strip()
-        .splitlines()
-    )
-    return out[-1] if out else ""
 
+def clip_patch(data, max_bytes=0):
+    """Decode patch bytes, cutting at max_bytes first so only the kept part is decoded."""
+    if max_bytes is None or max_bytes <= 0 or len(data) <= max_bytes:
+        return data.decode("utf-8", "replace"), False
+    return data[:max_bytes].decode("utf-8", "ignore"), True
 
-def commit_patch(root, sha, max_bytes=0):
-    txt = git(root, "show", "--patch", "--format=", "--no-color", sha)
-    
-    if max_bytes is None or max_bytes <= 0:
-        return txt, False
-    enc = txt.encode("utf-8")
 
-    if len(enc) <= max_bytes:
-        return txt, False
-    enc = enc[:max_bytes]
-    return enc.decode("utf-8", "ignore"), True
+def iter_commits_full(
+    root,
+    since,
+    until,
+    include_patch,
+    max_patch_bytes=0,
+    include_merges=False,
+    revs=("HEAD",),
+    save_patches=None,
+    writer=None,
+):
+    """Yield one commit object per commit in range, from a single `git log` process."""
+    args = log_args(since, until, include_merges, include_patch, revs)
+    for rec in iter_log_records(root, args):
+        *fields, changes = rec.split(b"\x00", LOG_FIELDS)
+        meta = parse_meta(fields)
+        files_detailed, pretty, patch = parse_changes(changes)
+
+        obj = {
+            **meta,
+            "short_sha": short_sha(meta["sha"]),
+            "files": files_detailed,
+            "diffstat_text": pretty,
+            "patch_ref": {
+                "embed": bool(include_patch),
+                "git_show_cmd": [
+                    "git",
+                    "show",
+                    "--patch",
+                    "--format=",
+                    "--no-color",
+                    meta["sha"],
+                ],
+                "local_patch_file": None,
+                "github_diff_url": None,
+                "github_patch_url": None,
+            },
+        }
 
+        if include_patch:
+            txt, clipped = clip_patch(patch, max_patch_bytes)
+            obj["patch"] = txt
+            obj["patch_clipped"] = bool(clipped)
 
-# ---------- branch scanning (UNMERGED) ----------
+        if save_patches:
+            path = patch_file_path(save_patches, meta["sha"])
+            data = patch if include_patch else None
+            writer.submit(save_patch_file, root, meta["sha"], save_patches, data)
+            obj["patch_ref"]["local_patch_file"] = path
+        yield obj
 
 
-def current_branch(root):
-    try:
-        name = git(root, "rev-parse", "--abbrev-ref", "HEAD").strip()
-        return None if name == "HEAD" else name
-    except Exception:
-        return None
+# ---------- branch scanning (UNMERGED) ----------
 
 
-def list_local_branches(root):
-    out = git(root, "for-each-ref", "refs/heads", "--format=%(refname:short)")
+def list_unmerged_branches(root):
+    """Local branches whose tip isn't reachable from HEAD (HEAD's own branch never is)."""
+    out = git(root, "for-each-ref", "--no-merged", "HEAD", "refs/heads", "--format=%(refname:short)")
     return [l.strip() for l in out.splitlines() if l.strip()]
 
 
-def branch_ahead_behind(root, branch):
+def branch_divergence(root, branch):
+    """Ahead/behind counts vs HEAD from one rev-list; merged means nothing ahead."""
     out = git(root, "rev-list", "--left-right", "--count", f"HEAD...{branch}").strip()
     try:
         left, right = [int(x) for x in out.split()]
-        return {"behind_head": left, "ahead_of_head": right}
+        return {"merged_into_head": right == 0, "ahead_of_head": right, "behind_head": left}
     except Exception:
-        return {"behind_head": None, "ahead_of_head": None}
+        return {"merged_into_head": None, "ahead_of_head": None, "behind_head": None}
 
 
-def branch_merged_into_head(root, branch):
-    try:
-        rc = subprocess.run(
-            ["git", "merge-base", "--is-ancestor", branch, "HEAD"],
-            cwd=root,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        ).returncode
-        return rc == 0
-    except Exception:
-        return None
+def unmerged_commits_in_range(
+    root,
+    branch,
+    since,
+    until,
+    include_patch,
+    max_patch_bytes,
+    include_merges,
+    save_patches=None,
+    writer=None,
+):
+    return list(
+        iter_commits_full(
+            root,
+            since,
+            until,
+            include_patch,
+            max_patch_bytes,
+            include_merges,
+            revs=(branch, "^HEAD"),
+            save_patches=save_patches,
+            writer=writer,
+        )
+    )
 
 
-def unmerged_commits_in_range(root, branch, since, until, include_merges):
-    args = [
-        "-c",
-        "log.showSignature=false",
-        "rev-list",
-        branch,
-        "^HEAD",
-        f"--since={since}",
-        f"--until={until}",
-        "--date-order",
-        "--reverse",
-    ]
-    if not include_merges:
-        args.insert(4, "--no-merges")
-    out = git(root, *args)
-    return [l.strip() for l in out.splitlines() if l.strip()]
+# ---------- writing ----------
 
 
-# ---------- writing ----------
+SPOOL_MAX_MEMORY = 32 * 1024 * 1024  # streamed commits spill to disk past this
+
+
+def json_bytes(obj, depth=0):
+    """JSON as bytes; with RC.pretty, indented to sit `depth` levels inside a document."""
+    if not RC.pretty:
+        if orjson is not None:
+            return orjson.dumps(obj)
+        # raw UTF-8 like orjson, so compact output doesn't depend on what's installed
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    # json, not orjson: --pretty keeps the historical \uXXXX escapes byte for byte
+    data = json.dumps(obj, indent=2).encode("utf-8")
+    # JSON strings escape newlines, so every raw newline is a layout break
+    return data.replace(b"\n", b"\n" + b"  " * depth) if depth else data
 
 
 def write_json(path, obj):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2)
+    parent = os.path.dirname(path)
+
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    data = json_bytes(obj)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class CommitsStream:
+    """Spool encoded commits for a report's "commits" array; write_report splices them in."""
+
+    def __init__(self):
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self.count = 0
+        self.nl = b"\n" if RC.pretty else b""  # newline + indent unit, or nothing
+        self.pad = b"  " if RC.pretty else b""
+
+    def append(self, obj):
+        if self.count:
+            self.spool.write(b",")
+        self.spool.write(self.nl + self.pad * 2)
+        self.spool.write(json_bytes(obj, depth=2))
+        self.count += 1
+
+    def write_report(self, f, manifest, tail):
+        nl, pad = self.nl, self.pad
+        colon = b": " if RC.pretty else b":"
+        head = json_bytes(manifest).removesuffix(nl + b"}")
+        f.write(head + b"," + nl + pad + b'"commits"' + colon + b"[")
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, f)
+        self.spool.close()
+        f.write(nl + pad + b"]" if self.count else b"]")
+        for key, value in tail.items():
+            f.write(b"," + nl + pad + json_bytes(key) + colon + json_bytes(value, depth=1))
+        f.write(nl + b"}")
+
+
+def fetch_patch(root, sha, out_file):
+    """Point `git show --patch` for sha straight at out_file; nothing passes through Python."""
+    cmd = ["git", "show", "--patch", "--format=", "--no-color", sha]
+    p = subprocess.run(cmd, cwd=root, stdout=out_file, stderr=subprocess.PIPE, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"cmd failed: {' '.join(cmd)}\n{p.stderr}")
+
+
+def patch_file_path(out_dir, sha):
+    return os.path.join(out_dir, f"{short_sha(sha)}.patch")
 
 
-def save_patch_file(root, sha, out_dir):
+def save_patch_file(root, sha, out_dir, patch=None):
+    """Write <short_sha>.patch; `patch` bytes (already streamed) skip the git call."""
     os.makedirs(out_dir, exist_ok=True)
-    p = os.path.join(out_dir, f"{short_sha(sha)}.patch")
-    txt = git(root, "show", "--patch", "--format=", "--no-color", sha)
-    with open(p, "w", encoding="utf-8") as f:
-        f.write(txt)
+    p = patch_file_path(out_dir, sha)
+    with open(p, "wb") as f:
+        if patch is None:
+            fetch_patch(root, sha, f)
+        else:
+            f.write(patch)
     return p
 
 
+IO_WORKERS = os.cpu_count() or 4
+
+
+class ShardWriter:
+    """Run per-commit file writes on a bounded thread pool; errors re-raise on submit or exit."""
+
+    def __init__(self, workers=IO_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = set()
+        self.limit = workers * 4
+
+    def submit(self, fn, *args):
+        if len(self.pending) >= self.limit:
+            done, self.pending = wait(self.pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                fut.result()
+        self.pending.add(self.pool.submit(fn, *args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.shutdown(wait=True)
+
+        if exc_type is None:
+            for fut in self.pending:
+                fut.result()
+
+
 # ---------- reporting core ----------
 
 
-def build_commit_obj(
-    root, sha, include_patch, max_patch_bytes, save_patches, github_prs
-):
-    meta = commit_meta(root, sha)
-    files, num_map = commit_numstat(root, sha)
-    ns = commit_name_status(root, sha)
-    pretty = commit_shortstat(root, sha)
-
-    files_detailed = []
-
-    if ns:
-        for entry in ns:
-            path = entry.get("file")
-            adds, dels = num_map.get(path, (None, None))
-            item = {
-                "file": path,
-                "status": entry["status"],
-                "additions": adds,
-                "deletions": dels,
-            }
-            if "old_path" in entry:
-                item["old_path"] = entry["old_path"]
-            files_detailed.append(item)
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_with_prs(root, commits, github_prs, on_head=True):
+    """Yield (commit, prs) in order, looking PRs up concurrently ahead of the consumer."""
+    if not github_prs:
+        for obj in commits:
+            yield obj, None
+        return
+    if os.environ.get("GITHUB_TOKEN"):
+        fetch, size, ahead = gh_prs_bulk, GH_GRAPHQL_BATCH, 2
     else:
-        for f in files:
-            files_detailed.append(
-                {
-                    "file": f["file"],
-                    "status": "M",
-                    "additions": f["additions"],
-                    "deletions": f["deletions"],
-                }
-            )
+        fetch, size, ahead = gh_prs_rest, 1, GH_MAX_WORKERS * 4
+    with ThreadPoolExecutor(max_workers=GH_MAX_WORKERS) as pool:
+        pending = deque()
+        for batch in iter_batches(commits, size):
+            pending.append((batch, pool.submit(fetch_prs_cached, fetch, root, batch, on_head)))
 
-    obj = {
-        **meta,
-        "short_sha": short_sha(meta["sha"]),
-        "files": files_detailed,
-        "diffstat_text": pretty,
-        "patch_ref": {
-            "embed": bool(include_patch),
-            "git_show_cmd": [
-                "git",
-                "show",
-                "--patch",
-                "--format=",
-                "--no-color",
-                meta["sha"],
-            ],
-            "local_patch_file": None,
-            "github_diff_url": None,
-            "github_patch_url": None,
-        },
-    }
+            if len(pending) < ahead:
+                continue
+            batch, fut = pending.popleft()
+            prs_by_sha = fut.result()
+            for obj in batch:
+                yield obj, prs_by_sha.get(obj["sha"], [])
+        while pending:
+            batch, fut = pending.popleft()
+            prs_by_sha = fut.result()
+            for obj in batch:
+                yield obj, prs_by_sha.get(obj["sha"], [])
+
+
+def build_commit_obj(root, obj, prs):
+    """Attach PR enrichment to a commit object from `iter_commits_full`."""
+    if prs:
+        obj["github_prs"] = prs
+        obj["patch_ref"]["github_diff_url"] = prs[0].get("diff_url")
+        obj["patch_ref"]["github_patch_url"] = prs[0].get("patch_url")
 
-    if github_prs:
-        prs = gh_prs_for_commit(root, meta["sha"])
+    return obj
 
-        if prs:
-            obj["github_prs"] = prs
-            obj["patch_ref"]["github_diff_url"] = prs[0].get("diff_url")
-            obj["patch_ref"]["github_patch_url"] = prs[0].get("patch_url")
 
-    if include_patch:
-        patch, clipped = commit_patch(root, meta["sha"], max_patch_bytes)
-        obj["patch"] = patch
-        obj["patch_clipped"] = bool(clipped)
+class ApproxDistinct:
+    """Distinct-string counter: exact set up to PROMOTE_AT, then a 2**P-register HyperLogLog."""
 
-    if save_patches:
-        obj["patch_ref"]["local_patch_file"] = save_patch_file(
-            root, meta["sha"], save_patches
-        )
+    P = 14
+    PROMOTE_AT = 10_000
 
-    return obj
+    def __init__(self):
+        self.exact = set()
+        self.registers = None
+
+    def add(self, value):
+        if self.registers is None:
+            self.exact.add(value)
+
+            if len(self.exact) > self.PROMOTE_AT:
+                self._promote()
+            return
+        self._add_hashed(value)
+
+    def _promote(self):
+        self.registers = bytearray(1 << self.P)
+        for value in self.exact:
+            self._add_hashed(value)
+        self.exact = None
+
+    def _add_hashed(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "big")
+        idx = h >> (64 - self.P)
+        rest = h & ((1 << (64 - self.P)) - 1)
+        rank = (64 - self.P) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def __len__(self):
+        if self.registers is None:
+            return len(self.exact)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small ranges
+        return int(round(estimate))
+
+
+@dataclass
+class SummaryAccumulator:
+    additions: int = 0
+    deletions: int = 0
+    files: object = field(default_factory=set)  # set, or ApproxDistinct
+
+    def as_dict(self):
+        return {
+            "additions": self.additions,
+            "deletions": self.deletions,
+            "files_touched": len(self.files),
+        }
 
 
-def accumulate_manifest(manifest, commit_obj):
+def accumulate_manifest(manifest, acc, commit_obj):
+    manifest["count"] += 1
     akey = f"{commit_obj['author']['name']} <{commit_obj['author']['email']}>"
     manifest["authors"][akey] = manifest["authors"].get(akey, 0) + 1
     for f in commit_obj["files"]:
-        manifest["summary"]["additions"] += f["additions"] or 0
-        manifest["summary"]["deletions"] += f["deletions"] or 0
-        manifest["summary"]["_files_touched_set"].add(f["file"])
+        acc.additions += f["additions"] or 0
+        acc.deletions += f["deletions"] or 0
+        acc.files.add(f["file"])
 
 
-def finalize_manifest(manifest):
-    s = manifest["summary"]
-    s["files_touched"] = len(s.pop("_files_touched_set", set()))
+def finalize_manifest(manifest, acc):
+    manifest["summary"] = acc.as_dict()
 
 
 def report_for_range(
@@ -542,8 +1039,6 @@ def report_for_range(
     include_unmerged,
     out_path="-",
 ):
-    commits = commits_in_range(root, since, until, include_merges=include_merges)
-
     manifest = {
         "label": label,
         "range": {"since": since, "until": until},
@@ -551,11 +1046,12 @@ def report_for_range(
         "include_merges": include_merges,
         "include_patch": include_patch,
         "mode": "full" if mode_full else "simple",
-        "count": len(commits),
+        "count": 0,  # filled in as the log streams
         "authors": {},
-        "summary": {"additions": 0, "deletions": 0, "_files_touched_set": set()},
+        "summary": {},  # filled in by finalize_manifest
         "items": [],  # filenames (full) or inline commits (simple)
     }
+    acc = SummaryAccumulator(files=ApproxDistinct() if RC.approx_files_touched else set())
 
     unmerged_section = None
 
@@ -564,153 +1060,164 @@ def report_for_range(
         subdir = os.path.join(base, label or "window")
         os.makedirs(subdir, exist_ok=True)
 
-        for sha in commits:
-            obj = build_commit_obj(
+        # shard and patch files are written off-thread; the manifest stays here
+        with ShardWriter() as writer:
+            commits = iter_commits_full(
                 root,
-                sha,
+                since,
+                until,
                 include_patch,
                 max_patch_bytes,
-                os.path.join(subdir, "patches") if save_patches else None,
-                github_prs,
-            )
-            accumulate_manifest(manifest, obj)
-            ts = datetime.fromtimestamp(
-                obj["timestamps"]["commit"], tz=timezone.utc
-            ).astimezone()
-            fname = f"{ts.strftime('%Y.%m.%d')}-{ts.strftime('%H.%M')}-{obj['short_sha']}.json"
-            write_json(os.path.join(subdir, fname), obj)
-            manifest["items"].append(
-                {
-                    "sha": obj["sha"],
-                    "file": os.path.join(label or "window", fname),
-                    "subject": obj["subject"],
-                }
+                include_merges,
+                save_patches=os.path.join(subdir, "patches") if save_patches else None,
+                writer=writer,
             )
 
-        # Unmerged scanning (branches)
-        if include_unmerged:
-            cur = current_branch(root)
-            branches = [b for b in list_local_branches(root) if b != cur]
-            unmerged_section = {
-                "branches_scanned": len(branches),
-                "branches": [],
-                "total_unmerged_commits": 0,
-            }
-            for br in branches:
-                uniq_shas = unmerged_commits_in_range(
-                    root, br, since, until, include_merges
+            for obj, prs in iter_with_prs(root, commits, github_prs):
+                obj = build_commit_obj(root, obj, prs)
+                accumulate_manifest(manifest, acc, obj)
+                ts = local_datetime(obj["timestamps"]["commit"])
+                fname = f"{ts.strftime('%Y.%m.%d')}-{ts.strftime('%H.%M')}-{obj['short_sha']}.json"
+                writer.submit(write_json, os.path.join(subdir, fname), obj)
+                manifest["items"].append(
+                    {
+                        "sha": obj["sha"],
+                        "file": os.path.join(label or "window", fname),
+                        "subject": obj["subject"],
+                    }
                 )
-                if not uniq_shas:
-                    continue
-                merged = branch_merged_into_head(root, br)
-                aheadbehind = branch_ahead_behind(root, br)
-                br_dir = os.path.join(subdir, "unmerged", br.replace("/", "__"))
-                os.makedirs(br_dir, exist_ok=True)
-                items = []
-                for sha in uniq_shas:
-                    obj = build_commit_obj(
+
+            # Unmerged scanning (branches)
+            if include_unmerged:
+                branches = list_unmerged_branches(root)
+                unmerged_section = {
+                    "branches_scanned": len(branches),
+                    "branches": [],
+                    "total_unmerged_commits": 0,
+                }
+                for br in branches:
+                    br_dir = os.path.join(subdir, "unmerged", br.replace("/", "__"))
+                    uniq_commits = unmerged_commits_in_range(
                         root,
-                        sha,
+                        br,
+                        since,
+                        until,
                         include_patch,
                         max_patch_bytes,
+                        include_merges,
                         os.path.join(br_dir, "patches") if save_patches else None,
-                        github_prs,
+                        writer,
                     )
-                    ts = datetime.fromtimestamp(
-                        obj["timestamps"]["commit"], tz=timezone.utc
-                    ).astimezone()
-                    fname = f"{ts.strftime('%Y.%m.%d')}-{ts.strftime('%H.%M')}-{obj['short_sha']}.json"
-                    write_json(os.path.join(br_dir, fname), obj)
-                    items.append(
+                    if not uniq_commits:
+                        continue
+                    divergence = branch_divergence(root, br)
+                    os.makedirs(br_dir, exist_ok=True)
+                    items = []
+                    for obj, prs in iter_with_prs(root, uniq_commits, github_prs, on_head=False):
+                        obj = build_commit_obj(root, obj, prs)
+                        ts = local_datetime(obj["timestamps"]["commit"])
+                        fname = f"{ts.strftime('%Y.%m.%d')}-{ts.strftime('%H.%M')}-{obj['short_sha']}.json"
+                        writer.submit(write_json, os.path.join(br_dir, fname), obj)
+                        items.append(
+                            {
+                                "sha": obj["sha"],
+                                "file": os.path.join(
+                                    label or "window",
+                                    "unmerged",
+                                    br.replace("/", "__"),
+                                    fname,
+                                ),
+                                "subject": obj["subject"],
+                            }
+                        )
+                    unmerged_section["branches"].append(
                         {
-                            "sha": obj["sha"],
-                            "file": os.path.join(
-                                label or "window",
-                                "unmerged",
-                                br.replace("/", "__"),
-                                fname,
-                            ),
-                            "subject": obj["subject"],
+                            "name": br,
+                            **divergence,
+                            "items": items,
                         }
                     )
-                unmerged_section["branches"].append(
-                    {
-                        "name": br,
-                        "merged_into_head": merged,
-                        "ahead_of_head": aheadbehind["ahead_of_head"],
-                        "behind_head": aheadbehind["behind_head"],
-                        "items": items,
-                    }
-                )
-                unmerged_section["total_unmerged_commits"] += len(items)
+                    unmerged_section["total_unmerged_commits"] += len(items)
 
-        finalize_manifest(manifest)
+        finalize_manifest(manifest, acc)
         if unmerged_section:
             manifest["unmerged_activity"] = unmerged_section
         write_json(os.path.join(base, f"manifest-{label or 'window'}.json"), manifest)
         return {"dir": base, "manifest": f"manifest-{label or 'window'}.json"}
 
     else:
-        # simple: single JSON array
-        commits_out = []
+        # simple: single JSON array, streamed so commits aren't all held at once
+        commits_out = CommitsStream()
 
-        for sha in commits:
-            obj = build_commit_obj(
-                root, sha, include_patch, max_patch_bytes, save_patches, github_prs
+        with ShardWriter() as writer:
+            commits = iter_commits_full(
+                root,
+                since,
+                until,
+                include_patch,
+                max_patch_bytes,
+                include_merges,
+                save_patches=save_patches,
+                writer=writer,
             )
-            accumulate_manifest(manifest, obj)
-            commits_out.append(obj)
-
-        # Unmerged scanning (branches)
-        if include_unmerged:
-            cur = current_branch(root)
-            branches = [b for b in list_local_branches(root) if b != cur]
-            unmerged_section = {
-                "branches_scanned": len(branches),
-                "branches": [],
-                "total_unmerged_commits": 0,
-            }
-            for br in branches:
-                uniq_shas = unmerged_commits_in_range(
-                    root, br, since, until, include_merges
-                )
-                if not uniq_shas:
-                    continue
-                merged = branch_merged_into_head(root, br)
-                aheadbehind = branch_ahead_behind(root, br)
-                br_commits = []
-                for sha in uniq_shas:
-                    br_commits.append(
-                        build_commit_obj(
-                            root,
-                            sha,
-                            include_patch,
-                            max_patch_bytes,
-                            save_patches,
-                            github_prs,
-                        )
+
+            for obj, prs in iter_with_prs(root, commits, github_prs):
+                obj = build_commit_obj(root, obj, prs)
+                accumulate_manifest(manifest, acc, obj)
+                commits_out.append(obj)
+
+            # Unmerged scanning (branches)
+            if include_unmerged:
+                branches = list_unmerged_branches(root)
+                unmerged_section = {
+                    "branches_scanned": len(branches),
+                    "branches": [],
+                    "total_unmerged_commits": 0,
+                }
+                for br in branches:
+                    uniq_commits = unmerged_commits_in_range(
+                        root,
+                        br,
+                        since,
+                        until,
+                        include_patch,
+                        max_patch_bytes,
+                        include_merges,
+                        save_patches,
+                        writer,
                     )
-                unmerged_section["branches"].append(
-                    {
-                        "name": br,
-                        "merged_into_head": merged,
-                        "ahead_of_head": aheadbehind["ahead_of_head"],
-                        "behind_head": aheadbehind["behind_head"],
-                        "commits": br_commits,
-                    }
-                )
-                unmerged_section["total_unmerged_commits"] += len(br_commits)
+                    if not uniq_commits:
+                        continue
+                    divergence = branch_divergence(root, br)
+                    br_commits = []
+                    for obj, prs in iter_with_prs(root, uniq_commits, github_prs, on_head=False):
+                        br_commits.append(build_commit_obj(root, obj, prs))
+                    unmerged_section["branches"].append(
+                        {
+                            "name": br,
+                            **divergence,
+                            "commits": br_commits,
+                        }
+                    )
+                    unmerged_section["total_unmerged_commits"] += len(br_commits)
 
-        finalize_manifest(manifest)
-        out = {**manifest, "commits": commits_out}
+        finalize_manifest(manifest, acc)
+        tail = {}
         if unmerged_section:
-            out["unmerged_activity"] = unmerged_section
+            tail["unmerged_activity"] = unmerged_section
 
         if out_path == "-":
-            json.dump(out, sys.stdout, indent=2)
-            sys.stdout.write("\n")
+            sys.stdout.flush()
+            commits_out.write_report(sys.stdout.buffer, manifest, tail)
+            sys.stdout.buffer.write(b"\n")
+            sys.stdout.buffer.flush()
         else:
-            write_json(out_path, out)
+            parent = os.path.dirname(out_path)
+
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            with open(out_path, "wb") as f:
+                commits_out.write_report(f, manifest, tail)
         return {"file": out_path}
 
 
@@ -777,6 +1284,11 @@ def main():
         action="store_true",
         help="Try to enrich with GitHub PRs (quietly ignored if not available)",
     )
+    ap.add_argument(
+        "--pr-cache-dir",
+        default=default_pr_cache_dir(),
+        help="Cache for GitHub PR lookups, keyed by commit SHA (default: $XDG_CACHE_HOME/git-activity-report/prs; empty disables)",
+    )
 
     # Unmerged branches
     ap.add_argument(
@@ -785,6 +1297,25 @@ def main():
         help="Scan local branches for commits in the window not reachable from HEAD; include separately.",
     )
 
+    ap.add_argument(
+        "--approx-files-touched",
+        action="store_true",
+        help="Estimate summary.files_touched with a fixed-size HyperLogLog past 10k files (~1%% error)",
+    )
+
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Buckets to report on concurrently for multi-window --for phrases (default: 1)",
+    )
+
+    ap.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Indent JSON output for reading (default: compact)",
+    )
+
     # Timezone (ReportConfiguration)
     ap.add_argument(
         "--tz",
@@ -798,16 +1329,23 @@ def main():
         sys.exit(1)
 
     args = ap.parse_args()
+    if args.jobs < 1:
+        ap.error("--jobs must be at least 1")
     RC.tz = args.tz  # single point of truth
+    RC.pr_cache_dir = args.pr_cache_dir
+    RC.approx_files_touched = args.approx_files_touched
+    RC.pretty = args.pretty
 
     # Determine windows
     buckets = []
     single = None
+    label = None
 
     if args.month:
         single = month_bounds(args.month)
+        label = args.month
     elif args.for_str:
-        buckets, single = parse_for_phrase(args.for_str)
+        buckets, single, label = parse_for_phrase(args.for_str)
     elif args.since and args.until:
         single = (args.since, args.until)
     else:
@@ -832,7 +1370,9 @@ def main():
             "include_patch": args.include_patch,
             "include_unmerged": args.include_unmerged,
         }
-        for label, since, until in buckets:
+
+        def run_bucket(bucket):
+            label, since, until = bucket
             if mode_full:
                 res = report_for_range(
                     root,
@@ -849,51 +1389,46 @@ def main():
                     args.include_unmerged,
                     out_path="-",
                 )
-                top_manifest["buckets"].append(
-                    {
-                        "label": label,
-                        "range": {"since": since, "until": until},
-                        "manifest": res.get("manifest"),
-                        "dir": res.get("dir", top),
-                    }
-                )
-            else:
-                fpath = os.path.join(top, f"{label}.json")
-                res = report_for_range(
-                    root,
-                    label,
-                    since,
-                    until,
-                    False,
-                    None,
-                    args.include_merges,
-                    args.include_patch,
-                    args.max_patch_bytes,
-                    args.save_patches,
-                    args.github_prs,
-                    args.include_unmerged,
-                    out_path=fpath,
-                )
-                top_manifest["buckets"].append(
-                    {
-                        "label": label,
-                        "range": {"since": since, "until": until},
-                        "file": fpath,
-                    }
-                )
+                return {
+                    "label": label,
+                    "range": {"since": since, "until": until},
+                    "manifest": res.get("manifest"),
+                    "dir": res.get("dir", top),
+                }
+            fpath = os.path.join(top, f"{label}.json")
+            report_for_range(
+                root,
+                label,
+                since,
+                until,
+                False,
+                None,
+                args.include_merges,
+                args.include_patch,
+                args.max_patch_bytes,
+                args.save_patches,
+                args.github_prs,
+                args.include_unmerged,
+                out_path=fpath,
+            )
+            return {
+                "label": label,
+                "range": {"since": since, "until": until},
+                "file": fpath,
+            }
+
+        # buckets write to separate files, so they can run side by side
+        if args.jobs > 1:
+            with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+                top_manifest["buckets"] = list(pool.map(run_bucket, buckets))
+        else:
+            top_manifest["buckets"] = [run_bucket(b) for b in buckets]
         write_json(os.path.join(top, "manifest.json"), top_manifest)
-        print(json.dumps({"dir": top, "manifest": "manifest.json"}, indent=2))
+        print(json_bytes({"dir": top, "manifest": "manifest.json"}).decode("utf-8"))
         return
 
     since, until = single
-    label = None
-
-    if args.month:
-        label = args.month
-    elif args.for_str in ("last week", "last month"):
-        label = args.for_str.replace(" ", "-")
-    else:
-        label = "window"
+    label = label or "window"
 
     if mode_full:
         res = report_for_range(
@@ -911,7 +1446,7 @@ def main():
             args.include_unmerged,
             out_path="-",
         )
-        print(json.dumps(res, indent=2))
+        print(json_bytes(res).decode("utf-8"))
     else:
         report_for_range(
             root,
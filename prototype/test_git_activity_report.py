@@ -0,0 +1,114 @@
+import importlib.util, json, os, subprocess, sys, tempfile, time, unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "git-activity-report.py")
+
+
+def git(root, *args, **kw):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "Ann Dev",
+        "GIT_AUTHOR_EMAIL": "ann@example.com",
+        "GIT_COMMITTER_NAME": "Ann Dev",
+        "GIT_COMMITTER_EMAIL": "ann@example.com",
+        "GIT_AUTHOR_DATE": "2025-08-01T10:00:00+00:00",
+        "GIT_COMMITTER_DATE": "2025-08-01T10:00:00+00:00",
+    }
+    return subprocess.run(["git", *args], cwd=root, env=env, check=True, **kw)
+
+
+class LogParsingTest(unittest.TestCase):
+    """Bytes git passes through verbatim must not be mistaken for record framing."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        git(self.root, "init", "-q")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def report(self, *args):
+        cmd = [sys.executable, SCRIPT, "--repo", self.root]
+        cmd += ["--since", "2025-07-01", "--until", "2025-09-01", *args]
+        out = subprocess.run(
+            cmd,
+            check=True,
+            capture_output=True,
+        ).stdout
+        return json.loads(out)
+
+    def commit(self, name, content, message):
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(content)
+        git(self.root, "add", name)
+        git(self.root, "commit", "-q", "-F", "-", input=message)
+
+    def test_separator_bytes_in_message(self):
+        self.commit("a.txt", b"a\n", b"sub\x1fject \x1e here\n\nbody\x1fline\n")
+        self.commit("b.txt", b"b\n", b"second\n")
+        commits = self.report()["commits"]
+        self.assertEqual([c["subject"] for c in commits], ["sub\x1fject \x1e here", "second"])
+        self.assertEqual(commits[0]["body"], "body\x1fline\n")
+
+    def test_separator_bytes_in_patch(self):
+        self.commit("a.txt", b"one\x1etwo\x1fthree\n", b"first\n")
+        self.commit("b.txt", b"b\n", b"second\n")
+        commits = self.report("--include-patch")["commits"]
+        self.assertEqual([c["subject"] for c in commits], ["first", "second"])
+        self.assertIn("+one\x1etwo\x1fthree", commits[0]["patch"])
+        self.assertEqual(commits[0]["files"][0]["additions"], 1)
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("git_activity_report", SCRIPT)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class PrCacheWriteTest(unittest.TestCase):
+    """Only lookups that can no longer change are written to the PR cache."""
+
+    OLD = time.time() - 7 * 24 * 3600
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.mod = load_script()
+        self.mod.RC.pr_cache_dir = self.tmp.name
+        self.mod.parse_origin_github = lambda root: ("o", "r")
+        self.calls = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def lookup_twice(self, prs, commit_ts=OLD, on_head=True):
+        def fetch(root, shas):
+            self.calls += 1
+            return {sha: prs for sha in shas}
+
+        batch = [{"sha": "ab" * 20, "timestamps": {"commit": commit_ts}}]
+        for _ in range(2):
+            got = self.mod.fetch_prs_cached(fetch, "/repo", batch, on_head)
+            self.assertEqual(got, {"ab" * 20: prs})
+        return self.calls
+
+    MERGED = {"state": "closed", "merged_at": "2025-08-01T00:00:00Z"}
+
+    def test_merged_and_closed_prs_are_cached(self):
+        prs = [self.MERGED, {"state": "closed", "merged_at": None}]
+        self.assertEqual(self.lookup_twice(prs), 1)
+
+    def test_open_pr_is_looked_up_again(self):
+        prs = [self.MERGED, {"state": "open", "merged_at": None}]
+        self.assertEqual(self.lookup_twice(prs), 2)
+
+    def test_no_prs_cached_only_for_commits_on_head(self):
+        self.assertEqual(self.lookup_twice([], on_head=False), 2)
+        self.assertEqual(self.lookup_twice([]), 3)
+
+    def test_recent_commit_is_looked_up_again(self):
+        self.assertEqual(self.lookup_twice([self.MERGED], commit_ts=time.time()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()